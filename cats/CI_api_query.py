@@ -2,8 +2,10 @@ import requests_cache
 from datetime import datetime, timezone
 
 from .forecast import CarbonIntensityPointEstimate
+from .parsers import parse_json_response
 
-def get_CI_forecast(location: str, CI_API_interface) -> list[CarbonIntensityPointEstimate]:
+
+def get_CI_forecast(location: str, CI_API_interface, session=None) -> list[CarbonIntensityPointEstimate]:
     """
     get carbon intensity from an API
 
@@ -11,16 +13,19 @@ def get_CI_forecast(location: str, CI_API_interface) -> list[CarbonIntensityPoin
     future carbon intensity.
 
     param location: [str] Depends on country. UK postcode (just the first section), e.g. M15.
+    param session: [requests.Session] optional session used for the API call,
+      e.g. a shared requests_cache.CachedSession. Defaults to a temporary cache.
     returns: a list of CarbonIntensityPointEstimate
     """
 
     # Setup a session for the API call. This uses a global HTTP cache
     # with the URL as the key. Failed attempts are not cached.
-    session = requests_cache.CachedSession('cats_cache', use_temp=True)
+    if session is None:
+        session = requests_cache.CachedSession('cats_cache', use_temp=True)
 
     # get the carbon intensity api data
     r = session.get(CI_API_interface.get_request_url(datetime.now(timezone.utc), location))
-    data = r.json()
+    data = parse_json_response(r)
 
     return CI_API_interface.parse_response_data(data)
 
@@ -1,14 +1,93 @@
 from argparse import ArgumentParser
-from datetime import datetime, timedelta
-import requests
-import yaml
+from datetime import timedelta
+from functools import partial
+import importlib
 import sys
 
-from .check_clean_arguments import validate_jobinfo, validate_duration
-from .optimise_starttime import get_avg_estimates  # noqa: F401
-from .CI_api_interface import API_interfaces, InvalidLocationError
-from .CI_api_query import get_CI_forecast  # noqa: F401
-from .carbonFootprint import greenAlgorithmsCalculator
+# Dependencies (requests, yaml...) and most submodules are imported
+# where they are first used, so that e.g. `cats --help` stays fast.
+# Names below are still reachable as attributes of the package, see
+# __getattr__.
+_LAZY_ATTRIBUTES = {
+    "API_interfaces": ".CI_api_interface",
+    "InvalidLocationError": ".CI_api_interface",
+    "get_CI_forecast": ".CI_api_query",
+    "greenAlgorithmsCalculator": ".carbonFootprint",
+    "validate_duration": ".check_clean_arguments",
+    "validate_jobinfo": ".check_clean_arguments",
+    "get_avg_estimates": ".optimise_starttime",
+}
+_SUBMODULES = (
+    "CI_api_interface",
+    "CI_api_query",
+    "carbonFootprint",
+    "check_clean_arguments",
+    "configure",
+    "daemon",
+    "forecast",
+    "optimise_starttime",
+    "parsers",
+    "profiling",
+)
+
+_SESSION = None
+
+
+def _get_session():
+    """Return the HTTP session shared by all API calls, creating it on
+    first use. Responses are cached on disk across invocations:
+    forecasts are half-hourly so a cached response is reused for 30
+    minutes, and a stale one is served if the API call fails. If the
+    on-disk cache cannot be created, an in-memory cache is used instead.
+    """
+    global _SESSION
+    if _SESSION is None:
+        import sqlite3
+        import requests_cache
+        from .configure import CACHE_DIR
+
+        cache_options = dict(
+            expire_after=timedelta(minutes=30),
+            stale_if_error=True,
+        )
+        try:
+            _SESSION = requests_cache.CachedSession(
+                cache_name=str(CACHE_DIR / "http"),
+                backend="sqlite",
+                **cache_options,
+            )
+        except (OSError, sqlite3.Error):
+            # e.g. no writable home directory. Responses are then only
+            # cached for the lifetime of the process.
+            _SESSION = requests_cache.CachedSession(
+                "cats_cache", backend="memory", **cache_options
+            )
+    return _SESSION
+
+
+def __getattr__(name):
+    # PEP 562 module level __getattr__, only called when name is not
+    # found in the module namespace.
+    if name == "SESSION":
+        return _get_session()
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        return getattr(module, name)
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def clear_caches():
+    """Clear the in-process caches of config files, fixed parameters
+    and IP location, see cats.configure.clear_caches.
+    """
+    from .carbonFootprint import load_fixed_parameters
+    from .configure import clear_caches
+
+    clear_caches()
+    load_fixed_parameters.cache_clear()
+
 
 def parse_arguments():
     """
@@ -19,7 +98,22 @@ def parse_arguments():
 
     ### Required
 
-    parser.add_argument("-d", "--duration", type=int, required=True, help="[required] Expected duration of the job in minutes.")
+    required = parser.add_mutually_exclusive_group(required=True)
+    required.add_argument("-d", "--duration", type=int, help="[required] Expected duration of the job in minutes.")
+    required.add_argument(
+        "--jobs-file", type=str,
+        help="[required, instead of --duration] Path to a CSV file describing several jobs, one per line, "
+             "as 'duration,jobinfo' (e.g. '60,cpus=2,gpus=0,memory=8,partition=CPU_partition'). "
+             "`jobinfo` is optional and defaults to --jobinfo. The carbon intensity forecast is "
+             "obtained once for all jobs, and one start time is printed per job."
+    )
+    required.add_argument(
+        "--daemon", action="store_true",
+        help="[required, instead of --duration] Run a server listening on `$XDG_RUNTIME_DIR/cats.sock` "
+             "(`~/.cache/cats/cats-<hostname>.sock` if XDG_RUNTIME_DIR is not set). While it runs, other "
+             "invocations of cats ask it for their estimates, so that concurrent jobs share a "
+             "single carbon intensity forecast request per location."
+    )
 
     ### Optional
 
@@ -51,29 +145,146 @@ def parse_arguments():
     return parser
 
 
+def _daemon_estimates(socket_path, api, location, session=None):
+    """Return a get_estimates(duration=) function asking the cats daemon
+    for estimates, see cats.daemon.query_estimates. If the daemon cannot
+    be reached, e.g. because it was stopped since it was found running,
+    the forecast is fetched directly instead, once for all later calls.
+    """
+    from . import daemon
+    from .CI_api_interface import API_interfaces
+    from .CI_api_query import get_CI_forecast
+    from .optimise_starttime import get_avg_estimates
+
+    forecast = None
+
+    def get_estimates(duration):
+        nonlocal forecast
+        if forecast is None:
+            try:
+                return daemon.query_estimates(socket_path, api, location, duration)
+            except OSError as e:
+                sys.stderr.write(f"WARNING: {e}, fetching forecast directly\n")
+                forecast = get_CI_forecast(location, API_interfaces[api], session=session)
+        return get_avg_estimates(forecast, duration=duration)
+
+    return get_estimates
+
+
+def _clean_jobinfo(jobinfo, partition_names):
+    """Validate job info string, see validate_jobinfo.
+
+    :param jobinfo: [str] job info string, as passed to --jobinfo
+    :param partition_names: [frozenset] names of the partitions in config
+    :return: [dict] validated job info, None if no job info was given,
+      or an empty dict if it is invalid or there is no partition in config.
+    """
+    from .check_clean_arguments import validate_jobinfo
+
+    if not jobinfo:
+        return None
+    if not partition_names:
+        return {}
+    return validate_jobinfo(jobinfo, expected_partition_names=partition_names)
+
+
+def _schedule_job(now_avg, best_avg, duration, jobinfo, config):
+    """Print the best start time of a job to stdout, along with carbon
+    footprint estimates if job info and config are available.
+
+    :param now_avg: [CarbonIntensityAverageEstimate] average carbon
+      intensity if the job is started now
+    :param best_avg: [CarbonIntensityAverageEstimate] lowest average
+      carbon intensity, and corresponding start time
+    :param duration: [int] duration of the job, in minutes
+    :param jobinfo: [dict] job info, as returned by _clean_jobinfo
+    :param config: [dict] content of config file
+    """
+    from .carbonFootprint import greenAlgorithmsCalculator
+
+    sys.stderr.write(str(best_avg) + "\n")
+
+    sys.stderr.write(f"Best job start time: {best_avg.start}\n")
+    print(f"{best_avg.start:%Y%m%d%H%M}")  # for POSIX compatibility with at -t
+
+    ################################
+    ## Calculate carbon footprint ##
+    ################################
+
+    error_message = "Not enough information to estimate total carbon footprint, both --jobinfo and config files are needed.\n"
+
+    if jobinfo is None:
+        return
+    if not jobinfo:
+        sys.stderr.write(error_message)
+        return
+
+    estim = greenAlgorithmsCalculator(
+        config=config,
+        runtime=timedelta(minutes=duration),
+        averageBest_carbonIntensity=best_avg.value, # TODO replace with real carbon intensity
+        averageNow_carbonIntensity=now_avg.value,
+        **jobinfo,
+    ).get_footprint()
+
+    sys.stderr.write(f"Estimated emmissions for running job now: {estim.now}\n")
+    msg = (
+        f"Estimated emmissions for running delayed job: {estim.best})\n"
+        f" (- {estim.savings})\n"
+    )
+    sys.stderr.write(msg)
+
+
 def main(arguments=None):
-    parser = parse_arguments()
-    args = parser.parse_args(arguments)
+    from .profiling import profile
+
+    # Set CATS_PROFILE=1 (or CATS_PROFILE=mem) to print per stage timings
+    with profile():
+        _main(arguments)
+
+
+def _main(arguments):
+    from .profiling import stage
+
+    with stage("argparse"):
+        parser = parse_arguments()
+        args = parser.parse_args(arguments)
+
+    with stage("imports"):
+        from . import daemon
+        from .carbonFootprint import load_fixed_parameters
+        from .CI_api_interface import API_interfaces, InvalidLocationError
+        from .CI_api_query import get_CI_forecast
+        from .check_clean_arguments import validate_duration, validate_jobs_file
+        from .configure import (
+            config_from_file, get_location_from_config_or_args, prefetch_ip_location,
+            run_in_background,
+        )
+        from .optimise_starttime import get_avg_estimates
+
+        session = _get_session()
+
+    if args.daemon:
+        daemon.serve(daemon.socket_path(), session=session)
+        return
+
+    # Network requests run in the background: unless a location is
+    # given on the command line, the location is estimated from the IP
+    # address while the config file is read. The forecast request is
+    # started as soon as the location is known, and overlaps with the
+    # validation of the job(s) duration and info and the loading of the
+    # footprint calculator parameters. These run in daemon threads, so
+    # that an early exit (e.g. on invalid arguments) never waits for
+    # them. Profiled stages only measure the time spent waiting on them.
+    ip_location = prefetch_ip_location(args, session=session)
 
     ##################################
     ## Validate and clean arguments ##
     ##################################
 
     ## config file
-    if args.config:
-        # if path to config file provided, it is used
-        with open(args.config, "r") as f:
-            config = yaml.safe_load(f)
-        sys.stderr.write(f"Using provided config file: {args.config}\n")
-    else:
-        # if no path provided, look for `config.yml` in current directory
-        try:
-            with open("config.yml", "r") as f:
-                config = yaml.safe_load(f)
-            sys.stderr.write("Using config.yml found in current directory\n")
-        except FileNotFoundError:
-            config = {}
-            sys.stderr.write("WARNING: config file not found\n")
+    with stage("config"):
+        config = config_from_file(args.config)
 
     ## CI API choice
     list_CI_APIs = ['carbonintensity.org.uk']
@@ -89,28 +300,77 @@ def main(arguments=None):
     sys.stderr.write(f"Using {choice_CI_API} for carbon intensity forecasts\n")
 
     ## Location
-    if args.location:
-        location = args.location
-        sys.stderr.write(f"Using location provided: {location}\n")
-    elif "location" in config.keys():
-        location = config["location"]
-        sys.stderr.write(f"Using location from config file: {location}\n")
+    with stage("location"):
+        location = get_location_from_config_or_args(
+            args, config, session=session, ip_location=ip_location
+        )
+
+    # If a cats daemon is running, it shares its forecasts with all
+    # cats invocations. Otherwise the forecast is fetched directly.
+    socket_path = daemon.socket_path()
+    forecast_future = None
+    if daemon.is_running(socket_path):
+        sys.stderr.write(f"Using cats daemon listening on {socket_path}\n")
     else:
-        r = requests.get("https://ipapi.co/json").json()
-        postcode = r["postal"]
-        location = postcode
-        sys.stderr.write(f"WARNING: location not provided. Estimating location from IP address: {location}.\n")
+        CI_API_interface = API_interfaces[choice_CI_API]
+        forecast_future = run_in_background(
+            get_CI_forecast, location, CI_API_interface, session=session
+        )
 
-    ## Duration
-    duration = validate_duration(args.duration)
+    ## Duration(s) and job info
+    with stage("validation"):
+        if args.jobs_file:
+            try:
+                jobs = validate_jobs_file(args.jobs_file)
+            except OSError as e:
+                sys.stderr.write(f"Error: cannot read jobs file {args.jobs_file}: {e.strerror}\n")
+                sys.exit(1)
+            except ValueError as e:
+                sys.stderr.write(f"Error: {e}\n")
+                sys.exit(1)
+            jobs = [(duration, jobinfo or args.jobinfo) for duration, jobinfo in jobs]
+        else:
+            jobs = [(validate_duration(args.duration), args.jobinfo)]
+
+        partition_names = frozenset(config.get("partitions", {}))
+        jobs = [
+            (duration, _clean_jobinfo(jobinfo, partition_names))
+            for duration, jobinfo in jobs
+        ]
+        if any(jobinfo for _, jobinfo in jobs):
+            load_fixed_parameters()
 
     ########################
     ## Obtain CI forecast ##
     ########################
 
-    CI_API_interface = API_interfaces[choice_CI_API]
     try:
-        CI_forecast = get_CI_forecast(location, CI_API_interface)
+        with stage("CI forecast"):
+            if forecast_future is None:
+                get_estimates = _daemon_estimates(
+                    socket_path, choice_CI_API, location, session=session
+                )
+            else:
+                get_estimates = partial(get_avg_estimates, forecast_future.result())
+
+        # The forecast and config are shared by all jobs
+        with stage("optimise"):
+            #############################
+            ## Find optimal start time ##
+            #############################
+
+            # Find best possible average carbon intensity, along with
+            # corresponding job start time. Estimates for all jobs are
+            # obtained before printing anything, so that a job
+            # exceeding the forecast horizon does not leave a batch
+            # half scheduled.
+            try:
+                estimates = [get_estimates(duration=duration) for duration, _ in jobs]
+            except ValueError as e:
+                sys.stderr.write(f"Error: {e}\n")
+                sys.exit(1)
+            for (duration, jobinfo), (now_avg, best_avg) in zip(jobs, estimates):
+                _schedule_job(now_avg, best_avg, duration, jobinfo, config)
     except InvalidLocationError:
         sys.stderr.write(f"Error: unknown location {location}\n")
         sys.stderr.write(
@@ -119,47 +379,6 @@ def main(arguments=None):
         )
         sys.exit(1)
 
-    #############################
-    ## Find optimal start time ##
-    #############################
-
-    # Find best possible average carbon intensity, along
-    # with corresponding job start time.
-    now_avg, best_avg = get_avg_estimates(
-        CI_forecast, duration=duration
-    )
-    sys.stderr.write(str(best_avg) + "\n")
-
-    sys.stderr.write(f"Best job start time: {best_avg.start}\n")
-    print(f"{best_avg.start:%Y%m%d%H%M}")  # for POSIX compatibility with at -t
-
-    ################################
-    ## Calculate carbon footprint ##
-    ################################
-
-    error_message = "Not enough information to estimate total carbon footprint, both --jobinfo and config files are needed.\n"
-
-    if args.jobinfo:
-        jobinfo = validate_jobinfo(args.jobinfo, expected_partition_names=config['partitions'].keys())
-
-        if not (jobinfo and config):
-            sys.stderr.write(error_message)
-        else:
-            estim = greenAlgorithmsCalculator(
-                config=config,
-                runtime=timedelta(minutes=args.duration),
-                averageBest_carbonIntensity=best_avg.value, # TODO replace with real carbon intensity
-                averageNow_carbonIntensity=now_avg.value,
-                **jobinfo,
-            ).get_footprint()
-
-            sys.stderr.write(f"Estimated emmissions for running job now: {estim.now}\n")
-            msg = (
-                f"Estimated emmissions for running delayed job: {estim.best})\n"
-                f" (- {estim.savings})"
-            )
-            sys.stderr.write(msg)
-
 
 if __name__ == "__main__":
     main()
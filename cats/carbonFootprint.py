@@ -1,10 +1,29 @@
 from collections import namedtuple
+import functools
 import yaml
 
+from .parsers import load_yaml
+
 
 Estimates = namedtuple("Estimates", ["now", "best", "savings"])
 
 
+@functools.lru_cache(maxsize=1)
+def load_fixed_parameters(path="fixed_parameters.yaml"):
+    """Load fixed parameters of the Green Algorithms calculator. The
+    file is only parsed once per process, and shared by all instances
+    of greenAlgorithmsCalculator (e.g. one per job with --jobs-file).
+
+    :param path: [str] path to the fixed parameters file
+    :return: [dict] fixed parameters
+    """
+    with open(path, "r") as stream:
+        try:
+            return load_yaml(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+
+
 class greenAlgorithmsCalculator:
     def __init__(
         self,
@@ -36,11 +55,7 @@ class greenAlgorithmsCalculator:
         self.cluster_info = config
 
         ### Load fixed parameters
-        with open("fixed_parameters.yaml", "r") as stream:
-            try:
-                self.fParams = yaml.safe_load(stream)
-            except yaml.YAMLError as exc:
-                print(exc)
+        self.fParams = load_fixed_parameters()
 
         self.partition = partition
         self.runtime = runtime
@@ -124,19 +139,11 @@ class greenAlgorithmsCalculator:
             TDP2use4GPU = partition_info["TDP"]
 
         ### Energy usage
+        runtime_hours = self.runtime.total_seconds() / 3600
         energies = {
-            "energy_CPUs": self.runtime.total_seconds()
-            / 3600
-            * self.cpus
-            * TDP2use4CPU
-            / 1000,  # in kWh
-            "energy_GPUs": self.runtime.total_seconds()
-            / 3600
-            * self.gpus
-            * TDP2use4GPU
-            / 1000,  # in kWh
-            "energy_memory": self.runtime.total_seconds()
-            / 3600
+            "energy_CPUs": runtime_hours * self.cpus * TDP2use4CPU / 1000,  # in kWh
+            "energy_GPUs": runtime_hours * self.gpus * TDP2use4GPU / 1000,  # in kWh
+            "energy_memory": runtime_hours
             * self.memory
             * self.fParams["power_memory_perGB"]
             / 1000,  # in kWh
@@ -1,6 +1,13 @@
+import csv
 import re
 import sys
 
+# Matches key=value pairs in the --jobinfo string
+_KV_RE = re.compile(r"(\w+)=(\w+)")
+
+# Keys required in the --jobinfo string
+_EXPECTED_INFO_KEYS = frozenset({"partition", "memory", "cpus", "gpus"})
+
 def validate_jobinfo(jobinfo: str, expected_partition_names):
     """Parses a string of job info keys in the form
 
@@ -15,31 +22,30 @@ def validate_jobinfo(jobinfo: str, expected_partition_names):
         A dictionary mapping info key to their specified values
     """
 
-    expected_info_keys = (
-        "partition",
-        "memory",
-        "cpus",
-        "gpus",
-    )
-    info = dict([match.groups() for match in re.finditer(r"(\w+)=(\w+)", jobinfo)])
+    info = dict([match.groups() for match in _KV_RE.finditer(jobinfo)])
 
     # Check if some information is missing
-    if missing_keys := set(expected_info_keys) - set(info.keys()):
-        sys.stderr.write(f"ERROR: Missing job info keys: {missing_keys}")
+    if missing_keys := _EXPECTED_INFO_KEYS.difference(info):
+        sys.stderr.write(f"ERROR: Missing job info keys: {set(missing_keys)}")
         return {}
 
     # Validate partition value
     if info["partition"] not in expected_partition_names:
-        sys.stderr.write(f"ERROR: job info key 'partition' should be one of {expected_partition_names}. Typo?\n")
+        sys.stderr.write(
+            f"ERROR: job info key 'partition' should be one of {sorted(expected_partition_names)}. Typo?\n"
+        )
         return {}
 
     # check that `cpus`, `gpus` and `memory` are numeric and convert to int
-    for key in [k for k in info if k != "partition"]:
-        try:
-            info[key] = int(info[key])
-        except ValueError:
+    for key, value in info.items():
+        if key == "partition":
+            continue
+        # Values matched by _KV_RE cannot have sign or whitespace, so
+        # any string of decimal digits is a valid int.
+        if not value.isdecimal():
             sys.stderr.write(f"ERROR: job info key {key} should be numeric\n")
             return {}
+        info[key] = int(value)
 
     return info
 
@@ -54,3 +60,43 @@ def validate_duration(duration):
         raise ValueError("--duration needs to be positive (number of minutes)")
 
     return duration_int
+
+def validate_jobs_file(path):
+    """Parses a CSV file describing several jobs, one per line, in the form
+
+    duration,jobinfo
+
+    for instance ``60,partition=CPU_partition,memory=8,cpus=8,gpus=0``.
+    The job info part is optional. Empty lines and lines starting with
+    ``#`` are ignored.
+
+    Returns
+    -------
+
+    jobs: list
+        A list of (duration, jobinfo) tuples, where duration is the
+        validated duration in minutes and jobinfo the job info string
+        (or None if absent).
+
+    Raises ValueError, mentioning path and line number, if a duration
+    is invalid.
+    """
+    jobs = []
+    with open(path, "r", newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row or row[0].lstrip().startswith("#"):
+                continue
+            duration, *jobinfo = row
+            # job info may contain commas, in which case it is split
+            # across several fields unless quoted.
+            jobinfo = ",".join(jobinfo).strip() or None
+            try:
+                duration = validate_duration(duration.strip())
+            except ValueError:
+                raise ValueError(
+                    f"{path}:{reader.line_num}: invalid job duration {duration!r}, "
+                    "should be a positive integer (number of minutes)"
+                ) from None
+            jobs.append((duration, jobinfo))
+    return jobs
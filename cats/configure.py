@@ -0,0 +1,240 @@
+import functools
+import json
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+import requests
+
+from .parsers import load_yaml, parse_json_response
+
+# User-level directory holding data cached from one cats invocation
+# to the next.
+CACHE_DIR = Path.home() / ".cache" / "cats"
+
+# Timeout, in seconds, of the HTTP requests used to estimate location
+IP_LOOKUP_TIMEOUT = 10
+
+
+def _write_cache_file(path: Path, data: bytes):
+    """Atomically write data to path. The data is first written to a
+    temporary file in the same directory, then moved in place with
+    os.replace, so that concurrent cats processes never read a
+    partially written file. Failure to write the cache is not an error.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _load_yaml_cached(path: Path):
+    """Return the parsed content of YAML file at path.
+
+    Parsed files are pickled into ``~/.cache/cats/config.pkl``, keyed by
+    absolute path, modification time and size, so that the YAML parser
+    only runs when the file has changed since the last invocation.
+    Within a process, the result is also memoized on the same key. The
+    returned dict is shared between calls and should not be modified.
+    """
+    path = path.resolve()
+    st = path.stat()
+    return _load_yaml_memo((str(path), st.st_mtime_ns, st.st_size))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_yaml_memo(key):
+    cache_file = CACHE_DIR / "config.pkl"
+    try:
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+        return cache[key]
+    except Exception:
+        # missing, corrupted or outdated cache
+        cache = {}
+
+    with open(key[0], "r") as f:
+        content = load_yaml(f)
+
+    # Only keep the latest version of each file
+    cache = {k: v for k, v in cache.items() if k[0] != key[0]}
+    cache[key] = content
+    _write_cache_file(cache_file, pickle.dumps(cache, protocol=pickle.HIGHEST_PROTOCOL))
+    return content
+
+
+def config_from_file(configpath=None):
+    """Load the config file. If no path is provided, look for
+    ``config.yml`` in the current directory.
+
+    :param configpath: [str] path to config file
+    :return: [dict] content of config file, empty if no config file
+      was found.
+    """
+    if configpath:
+        # if path to config file provided, it is used
+        config = _load_yaml_cached(Path(configpath))
+        sys.stderr.write(f"Using provided config file: {configpath}\n")
+    else:
+        # if no path provided, look for `config.yml` in current directory
+        try:
+            config = _load_yaml_cached(Path("config.yml"))
+            sys.stderr.write("Using config.yml found in current directory\n")
+        except FileNotFoundError:
+            config = {}
+            sys.stderr.write("WARNING: config file not found\n")
+    return config
+
+
+def _local_ip_lookup(ip=None, session=None):
+    """Estimate postcode from IP address using a local MaxMind
+    GeoLite2-City database, whose path is given by the ``CATS_GEOIP_DB``
+    environment variable. This requires the optional ``maxminddb``
+    dependency (``pip install climate-aware-task-scheduler[geoip]``).
+
+    :param ip: [str] public IP address. If not provided, it is obtained
+      from api.ipify.org.
+    :return: [str] postcode, or None if the database or the
+      ``maxminddb`` package is not available.
+    """
+    db_path = os.environ.get("CATS_GEOIP_DB")
+    if not (db_path and os.path.isfile(db_path)):
+        return None
+    try:
+        import maxminddb
+    except ImportError:
+        return None
+
+    if ip is None:
+        ip = (session or requests).get(
+            "https://api.ipify.org", timeout=IP_LOOKUP_TIMEOUT
+        ).text.strip()
+    with maxminddb.open_database(db_path, mode=maxminddb.MODE_MMAP) as reader:
+        record = reader.get(ip)
+    try:
+        return record["postal"]["code"]
+    except (TypeError, KeyError):
+        # IP address not in database, or no postcode for it
+        return None
+
+
+def _fetch_ip_location(session=None):
+    """Estimate postcode from IP address, using a local GeoLite2
+    database if available, ipapi.co otherwise.
+    """
+    if postal := _local_ip_lookup(session=session):
+        return postal
+    r = (session or requests).get("https://ipapi.co/json", timeout=IP_LOOKUP_TIMEOUT)
+    return parse_json_response(r)["postal"]
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_ip_location(ttl=86400, session=None):
+    """Return the postcode estimated from the IP address.
+
+    The result of the ipapi.co lookup is stored in
+    ``~/.cache/cats/location.json`` and reused for ``ttl`` seconds
+    (default 24h), so that the network is only hit on a cache miss.
+    Within a process, the result is memoized until clear_caches is
+    called.
+    """
+    cache_file = CACHE_DIR / "location.json"
+    try:
+        if time.time() - cache_file.stat().st_mtime < ttl:
+            with open(cache_file, "r") as f:
+                return json.load(f)["postal"]
+    except (OSError, ValueError, KeyError):
+        # missing or corrupted cache file, fall back to network lookup
+        pass
+
+    postal = _fetch_ip_location(session)
+    _write_cache_file(
+        cache_file, json.dumps({"postal": postal, "ts": time.time()}).encode()
+    )
+    return postal
+
+
+def run_in_background(fn, *args, **kwargs):
+    """Call fn(*args, **kwargs) in a daemon thread and return a
+    concurrent.futures.Future holding its result. Unlike
+    ThreadPoolExecutor workers, daemon threads are not joined at
+    interpreter exit, so a result that ends up not being needed (or a
+    hanging network call) never delays the exit of cats.
+    """
+    future = Future()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+def prefetch_ip_location(args, session=None):
+    """Start the IP based location lookup in the background, unless a
+    location is given on the command line, so that the network
+    round-trip overlaps with the parsing of the config file. If the
+    config file turns out to provide the location, the lookup is not
+    waited on: it runs in a daemon thread, so it never delays the exit
+    of cats, and is a file read anyway while ``location.json`` is fresh.
+
+    :param args: [argparse.Namespace] parsed command line arguments
+    :return: [concurrent.futures.Future] pending lookup, meant to be
+      passed to get_location_from_config_or_args, or None.
+    """
+    if args.location:
+        return None
+    return run_in_background(_cached_ip_location, session=session)
+
+
+def clear_caches():
+    """Clear the in-process memoization of config files and IP
+    location. On-disk caches are left untouched. This is useful for
+    long running processes using cats as a library.
+    """
+    _load_yaml_memo.cache_clear()
+    _cached_ip_location.cache_clear()
+
+
+def get_location_from_config_or_args(args, config, session=None, ip_location=None):
+    """Return location of the computing facility. Command line
+    argument takes precedence over config file, if neither is
+    provided the location is estimated from the IP address.
+
+    :param args: [argparse.Namespace] parsed command line arguments
+    :param config: [dict] content of config file
+    :param session: [requests.Session] optional session for the IP lookup
+    :param ip_location: [concurrent.futures.Future] optional pending IP
+      lookup, as returned by prefetch_ip_location. Only waited on if the
+      location is neither in the arguments nor in the config file.
+    :return: [str] location
+    """
+    if args.location:
+        location = args.location
+        sys.stderr.write(f"Using location provided: {location}\n")
+    elif "location" in config.keys():
+        location = config["location"]
+        sys.stderr.write(f"Using location from config file: {location}\n")
+    else:
+        if ip_location is not None:
+            location = ip_location.result()
+        else:
+            location = _cached_ip_location(session=session)
+        sys.stderr.write(f"WARNING: location not provided. Estimating location from IP address: {location}.\n")
+    return location
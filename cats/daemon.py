@@ -0,0 +1,209 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .CI_api_interface import API_interfaces, InvalidLocationError
+from .CI_api_query import get_CI_forecast
+from .configure import CACHE_DIR
+from .forecast import CarbonIntensityAverageEstimate
+from .optimise_starttime import get_avg_estimates
+
+# Only the latest forecasts are kept in memory by the server
+MAX_FORECASTS = 64
+
+
+def socket_path() -> Path:
+    """Return path of the socket the cats daemon listens on:
+    ``$XDG_RUNTIME_DIR/cats.sock``, or ``~/.cache/cats/cats-<hostname>.sock``
+    if ``XDG_RUNTIME_DIR`` is not set. The hostname keeps daemons on
+    different nodes apart when the home directory is shared between
+    them, as is common on clusters.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "cats.sock"
+    return CACHE_DIR / f"cats-{socket.gethostname()}.sock"
+
+
+def is_running(path: Path) -> bool:
+    """Return True if a cats daemon is listening on socket path"""
+    if not (hasattr(socket, "AF_UNIX") and path.exists()):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(str(path))
+        except OSError:
+            # stale socket file, e.g. left by a killed daemon
+            return False
+    return True
+
+
+def _encode_estimate(estimate: CarbonIntensityAverageEstimate) -> dict:
+    return {
+        "value": estimate.value,
+        "start": estimate.start.isoformat(),
+        "end": estimate.end.isoformat(),
+    }
+
+
+def _decode_estimate(d: dict) -> CarbonIntensityAverageEstimate:
+    return CarbonIntensityAverageEstimate(
+        value=d["value"],
+        start=datetime.fromisoformat(d["start"]),
+        end=datetime.fromisoformat(d["end"]),
+    )
+
+
+def query_estimates(path: Path, api: str, location: str, duration: int):
+    """Ask the cats daemon listening on socket path for the average
+    carbon intensity estimates of a job of given duration, starting now
+    and at the best time. This is the equivalent of
+    get_avg_estimates(get_CI_forecast(location, ...), duration).
+
+    :param path: [pathlib.Path] socket path, see socket_path
+    :param api: [str] name of the carbon intensity API
+    :param location: [str] location of the computing facility
+    :param duration: [int] duration of the job, in minutes
+    :return: (now_avg, best_avg) tuple of CarbonIntensityAverageEstimate
+    """
+    request = {"api": api, "location": location, "duration": duration}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(str(path))
+        with s.makefile("rwb") as f:
+            f.write(json.dumps(request).encode() + b"\n")
+            f.flush()
+            line = f.readline()
+    if not line:
+        # e.g. daemon stopped while handling the request
+        raise ConnectionError(f"cats daemon on {path} closed the connection")
+    response = json.loads(line)
+
+    if "error" in response:
+        if response["error"] == "invalid_location":
+            raise InvalidLocationError
+        raise ValueError(response["message"])
+    return _decode_estimate(response["now"]), _decode_estimate(response["best"])
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # connection closed without request, e.g. by is_running
+            return
+        try:
+            request = json.loads(line)
+            now_avg, best_avg = get_avg_estimates(
+                self.server.get_forecast(request["api"], request["location"]),
+                duration=int(request["duration"]),
+            )
+            response = {
+                "now": _encode_estimate(now_avg),
+                "best": _encode_estimate(best_avg),
+            }
+        except InvalidLocationError:
+            response = {"error": "invalid_location"}
+        except Exception as e:
+            # e.g. malformed request, job duration exceeding the
+            # forecast horizon or failed API call.
+            response = {"error": "failed_request", "message": str(e)}
+        try:
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+        except BrokenPipeError:
+            # client went away before reading the response
+            pass
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+
+    class ForecastServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Server answering the requests of cats invocations, see
+        query_estimates. Forecasts are fetched once per location and
+        half-hour window, and shared by all requests made during that
+        window. Concurrent requests for a forecast that is not
+        available yet wait for a single API call, without blocking
+        requests for other forecasts.
+        """
+        daemon_threads = True
+
+        def __init__(self, path: Path, session=None):
+            super().__init__(str(path), _RequestHandler)
+            self.session = session
+            self._forecasts = {}
+            # one lock per forecast being fetched, see get_forecast
+            self._key_locks = {}
+            # guards _forecasts and _key_locks
+            self._lock = threading.Lock()
+
+        def server_bind(self):
+            # The socket file is created with mode 0600 when binding, so
+            # that other users can never connect to it.
+            umask = os.umask(0o177)
+            try:
+                super().server_bind()
+            finally:
+                os.umask(umask)
+
+        def get_forecast(self, api: str, location: str):
+            CI_API_interface = API_interfaces[api]
+            # The request URL identifies both the location and the
+            # half-hour window of the forecast.
+            key = CI_API_interface.get_request_url(datetime.now(timezone.utc), location)
+            with self._lock:
+                if key in self._forecasts:
+                    return self._forecasts[key]
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+            with key_lock:
+                with self._lock:
+                    # fetched by a concurrent request while waiting
+                    if key in self._forecasts:
+                        return self._forecasts[key]
+                try:
+                    forecast = get_CI_forecast(
+                        location, CI_API_interface, session=self.session
+                    )
+                    with self._lock:
+                        if len(self._forecasts) >= MAX_FORECASTS:
+                            self._forecasts.clear()
+                        self._forecasts[key] = forecast
+                finally:
+                    with self._lock:
+                        if self._key_locks.get(key) is key_lock:
+                            del self._key_locks[key]
+            return forecast
+
+
+def serve(path: Path, session=None):
+    """Run the cats daemon on socket path, until interrupted."""
+    if not hasattr(socketserver, "UnixStreamServer"):
+        sys.stderr.write("Error: --daemon requires Unix domain sockets, not available on this platform\n")
+        sys.exit(1)
+    if is_running(path):
+        sys.stderr.write(f"Error: a cats daemon is already listening on {path}\n")
+        sys.exit(1)
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    try:
+        if not stat.S_ISSOCK(path.lstat().st_mode):
+            sys.stderr.write(f"Error: {path} exists and is not a socket\n")
+            sys.exit(1)
+        # stale socket, e.g. left by a killed daemon
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+    with ForecastServer(path, session=session) as server:
+        sys.stderr.write(f"cats daemon listening on {path}\n")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
@@ -1,5 +1,7 @@
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import accumulate
 
 
 @dataclass(order=True)
@@ -41,28 +43,34 @@ class WindowedForecast:
         # Restrict data points so that start time falls within the
         # first data interval.  In other we don't need any data prior
         # the closest data preceding (on the left of) the job start
-        # time.
-        def bisect_right(data, t):
-            for i, d in enumerate(data):
-                if d.datetime > t:
-                    return i - 1
-        # bisect_right(data, start) returns the index of the first
-        # data point with datetime value immediately preceding the job
-        # start time
-        self.data = data[bisect_right(data, start):]
+        # time.  bisect_right(times, start) - 1 is the index of the
+        # data point with datetime value immediately preceding the
+        # job start time.
+        times = [d.datetime for d in data]
+        first = bisect_right(times, start) - 1
+        self.data = data[first:]
+
+        # Keep times and values as separate sequences ("structure of
+        # arrays") so that windows can be evaluated without building
+        # intermediate lists of data points.
+        self.times = times[first:]
+        self.values = [d.value for d in self.data]
 
         # Find number of data points in a window, by finding the index
-        # of the closest data point past the job end time. Could be
-        # done with the bisect module in the stdlib for python 3.10+
-        # ('key' parameter was introduced in 3.10).
-        #
-        # bisect_left(data, self.end, key=lambda x: x.datetime)
-        #
-        def bisect_left(data, t):
-            for i, d in enumerate(data):
-                if d.datetime >= t:
-                    return i
-        self.ndata = bisect_left(self.data, self.end) + 1
+        # of the closest data point past the job end time.
+        self.ndata = bisect_left(self.times, self.end) + 1
+
+        # Cumulative integral of the timeseries from the first data
+        # point, using the trapezoidal rule.  The integral between any
+        # two data points is then the difference of two elements,
+        # instead of a sum over all the intervals in the window.
+        self.cumulative_integral = [0.] + list(accumulate(
+            0.5 * (v1 + v2) * (t2 - t1).total_seconds()
+            for v1, v2, t1, t2 in zip(
+                self.values[:-1], self.values[1:],
+                self.times[:-1], self.times[1:],
+            )
+        ))
 
     def __getitem__(self, index: int) -> CarbonIntensityAverageEstimate:
         """Return the average of timeseries data from index over the
@@ -94,22 +102,29 @@ class WindowedForecast:
             self.data[index + self.ndata - 1],
             when=window_end,
         )
-        # window_data <- [lbound] + [...bulk...] + [rbound] where
-        # lbound and rbound are interpolated intensity values.
-        window_data = (
-            [lbound] +
-            self.data[index + 1: index + self.ndata - 1] +
-            [rbound]
-        )
-        acc = [
-            0.5 * (a.value + b.value) * (b.datetime - a.datetime).total_seconds()
-            for a, b in zip(window_data[:-1], window_data[1:])
-        ]
-        duration = window_data[-1].datetime - window_data[0].datetime
+        duration = (window_end - window_start).total_seconds()
+
+        # Window is [lbound] + [...bulk...] + [rbound] where lbound
+        # and rbound are interpolated intensity values, and bulk the
+        # data points from index + 1 to index + ndata - 2.
+        first, last = index + 1, index + self.ndata - 2
+        if first > last:
+            # Both window start and end fall within the same data
+            # interval, there is no bulk.
+            integral = 0.5 * (lbound.value + rbound.value) * duration
+        else:
+            integral = (
+                0.5 * (lbound.value + self.values[first])
+                * (self.times[first] - window_start).total_seconds()
+                + self.cumulative_integral[last]
+                - self.cumulative_integral[first]
+                + 0.5 * (self.values[last] + rbound.value)
+                * (window_end - self.times[last]).total_seconds()
+            )
         return CarbonIntensityAverageEstimate(
             start=window_start,
             end=window_end,
-            value=sum(acc) / duration.total_seconds(),
+            value=integral / duration,
         )
 
     @staticmethod
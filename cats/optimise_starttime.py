@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from .forecast import WindowedForecast
 
 
@@ -7,14 +7,19 @@ def get_avg_estimates(data, duration=None):
     Get lowest carbon intensity in data depending on user method
     return dict of timestamp and carbon intensity
 
-    duration is in minutes
+    duration is in minutes. Raises ValueError if a job of this
+    duration starting now would end after the last data point.
     """
-    # make sure size is not greater than data size (but needs to
-    # adjust to different intervals, comparison to len(data) incorrect
-    # here TODO)
-    # if duration > len(data):
-    #     raise ValueError(
-    #         "Windowed method timespan cannot be greater than the cached timespan"
-    #     )
-    wf = WindowedForecast(data, duration, start=datetime.now())
+    start = datetime.now()
+    horizon = data[-1].datetime - start
+    if timedelta(minutes=duration) > horizon:
+        raise ValueError(
+            f"job duration ({duration} minutes) exceeds the forecast horizon "
+            f"({horizon.total_seconds() // 60:.0f} minutes from now)"
+        )
+    wf = WindowedForecast(data, duration, start=start)
+    if len(wf) <= 1:
+        # Job end falls within the last data interval: starting now is
+        # the only possible window, no need to scan the forecast.
+        return wf[0], wf[0]
     return wf[0], min(wf)
@@ -0,0 +1,27 @@
+import yaml
+
+try:
+    # libyaml based C parser, much faster than the pure Python one
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    # C implemented JSON parser, faster than the stdlib one
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def load_yaml(stream):
+    """Parse YAML document from stream (file object or string) with the
+    safe loader, libyaml based if available.
+    """
+    return yaml.load(stream, Loader=_YamlLoader)
+
+
+def parse_json_response(r):
+    """Return the parsed JSON body of requests.Response r, using orjson
+    if available.
+    """
+    return orjson.loads(r.content) if orjson else r.json()
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# (stage name, duration in ns) of stages run since profiling started
+_timings = []
+
+
+def _enabled():
+    # e.g. CATS_PROFILE=1 or CATS_PROFILE=mem, but not CATS_PROFILE=0
+    return os.environ.get("CATS_PROFILE", "").lower() not in ("", "0", "false")
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage ``name`` if the ``CATS_PROFILE``
+    environment variable is set. Does nothing otherwise.
+    """
+    if not _enabled():
+        yield
+        return
+    t0 = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _timings.append((name, time.perf_counter_ns() - t0))
+
+
+@contextmanager
+def profile():
+    """Report timings of the stages run in the enclosed block on
+    stderr, when the ``CATS_PROFILE`` environment variable is set.
+
+    With ``CATS_PROFILE=mem``, current and peak memory allocated by
+    Python, as traced by tracemalloc, are also reported.
+    """
+    if not _enabled():
+        yield
+        return
+    trace_memory = os.environ["CATS_PROFILE"] == "mem"
+    if trace_memory:
+        tracemalloc.start()
+    _timings.clear()
+    try:
+        yield
+    finally:
+        sys.stderr.write("Profile (wall-clock time per stage):\n")
+        for name, dt in _timings:
+            sys.stderr.write(f"  {name:<16} {dt / 1e6:10.3f} ms\n")
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            sys.stderr.write(
+                f"  memory: current {current / 1024:,.0f} KiB, peak {peak / 1024:,.0f} KiB\n"
+            )
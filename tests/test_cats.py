@@ -0,0 +1,36 @@
+from requests_cache import SQLiteCache
+
+import cats
+from cats import configure
+
+
+def test_session_falls_back_to_memory_cache(tmp_path, monkeypatch):
+    # Cache directory cannot be created under a regular file
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    monkeypatch.setattr(configure, "CACHE_DIR", not_a_dir / "cats")
+    monkeypatch.setattr(cats, "_SESSION", None)
+
+    session = cats._get_session()
+    assert not isinstance(session.cache, SQLiteCache)
+
+
+def test_lazy_attributes():
+    from cats.CI_api_interface import InvalidLocationError
+    from cats.check_clean_arguments import validate_jobinfo
+
+    assert cats.InvalidLocationError is InvalidLocationError
+    assert cats.validate_jobinfo is validate_jobinfo
+    for name in cats._LAZY_ATTRIBUTES:
+        assert getattr(cats, name) is not None
+
+
+def test_clean_jobinfo():
+    partitions = frozenset({"CPU_partition"})
+    jobinfo = "cpus=2,gpus=0,memory=8,partition=CPU_partition"
+    assert cats._clean_jobinfo(None, partitions) is None
+    assert cats._clean_jobinfo(jobinfo, frozenset()) == {}
+    assert cats._clean_jobinfo("cpus=2", partitions) == {}
+    assert cats._clean_jobinfo(jobinfo, partitions) == {
+        "cpus": 2, "gpus": 0, "memory": 8, "partition": "CPU_partition",
+    }
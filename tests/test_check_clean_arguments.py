@@ -0,0 +1,71 @@
+import pytest
+
+from cats.check_clean_arguments import validate_jobinfo, validate_jobs_file
+
+PARTITIONS = ("CPU_partition", "GPU_partition")
+
+
+def test_validate_jobinfo():
+    info = validate_jobinfo(
+        "cpus=2,gpus=0,memory=8,partition=CPU_partition",
+        expected_partition_names=PARTITIONS,
+    )
+    assert info == {
+        "cpus": 2, "gpus": 0, "memory": 8, "partition": "CPU_partition"
+    }
+
+
+def test_validate_jobinfo_missing_key():
+    info = validate_jobinfo(
+        "cpus=2,memory=8,partition=CPU_partition",
+        expected_partition_names=PARTITIONS,
+    )
+    assert info == {}
+
+
+def test_validate_jobinfo_unknown_partition():
+    info = validate_jobinfo(
+        "cpus=2,gpus=0,memory=8,partition=TPU_partition",
+        expected_partition_names=PARTITIONS,
+    )
+    assert info == {}
+
+
+def test_validate_jobinfo_not_numeric():
+    info = validate_jobinfo(
+        "cpus=two,gpus=0,memory=8,partition=CPU_partition",
+        expected_partition_names=PARTITIONS,
+    )
+    assert info == {}
+
+
+def test_validate_jobs_file(tmp_path):
+    jobs_file = tmp_path / "jobs.csv"
+    jobs_file.write_text(
+        "# duration,jobinfo\n"
+        "60,cpus=2,gpus=0,memory=8,partition=CPU_partition\n"
+        '120,"cpus=1,gpus=1,memory=4,partition=GPU_partition"\n'
+        "\n"
+        "30\n"
+    )
+    assert validate_jobs_file(jobs_file) == [
+        (60, "cpus=2,gpus=0,memory=8,partition=CPU_partition"),
+        (120, "cpus=1,gpus=1,memory=4,partition=GPU_partition"),
+        (30, None),
+    ]
+
+
+def test_validate_jobinfo_non_decimal_digits():
+    # '²' is a digit for str.isdigit, but not a valid int
+    info = validate_jobinfo(
+        "cpus=²,gpus=0,memory=8,partition=CPU_partition",
+        expected_partition_names=PARTITIONS,
+    )
+    assert info == {}
+
+
+def test_validate_jobs_file_invalid_duration(tmp_path):
+    jobs_file = tmp_path / "jobs.csv"
+    jobs_file.write_text("60\nabc,cpus=2\n")
+    with pytest.raises(ValueError, match=r"jobs.csv:2: invalid job duration 'abc'"):
+        validate_jobs_file(jobs_file)
@@ -0,0 +1,162 @@
+import json
+import os
+import time
+
+import pytest
+
+from cats import configure
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(configure, "CACHE_DIR", tmp_path)
+    configure.clear_caches()
+    yield tmp_path
+    configure.clear_caches()
+
+
+def test_ip_location_is_cached(cache_dir, monkeypatch):
+    calls = []
+
+    def fake_fetch(session=None):
+        calls.append(1)
+        return "OX1"
+
+    monkeypatch.setattr(configure, "_fetch_ip_location", fake_fetch)
+
+    assert configure._cached_ip_location() == "OX1"
+    assert configure._cached_ip_location() == "OX1"
+    assert len(calls) == 1
+    with open(cache_dir / "location.json") as f:
+        assert json.load(f)["postal"] == "OX1"
+
+
+def test_ip_location_cache_expires(cache_dir, monkeypatch):
+    cache_file = cache_dir / "location.json"
+    cache_file.write_text(json.dumps({"postal": "M15", "ts": 0}))
+    old = time.time() - 2 * 86400
+    os.utime(cache_file, (old, old))
+
+    monkeypatch.setattr(configure, "_fetch_ip_location", lambda session=None: "OX1")
+
+    assert configure._cached_ip_location() == "OX1"
+
+
+def test_prefetched_location_used_only_as_fallback():
+    from argparse import Namespace
+    from concurrent.futures import Future
+
+    args = Namespace(location=None)
+
+    pending = Future()
+    location = configure.get_location_from_config_or_args(
+        args, {"location": "EH8"}, ip_location=pending
+    )
+    # Pending lookup is not waited on
+    assert location == "EH8"
+
+    done = Future()
+    done.set_result("OX1")
+    location = configure.get_location_from_config_or_args(
+        args, {}, ip_location=done
+    )
+    assert location == "OX1"
+
+
+def test_local_ip_lookup_without_database(monkeypatch):
+    monkeypatch.delenv("CATS_GEOIP_DB", raising=False)
+    assert configure._local_ip_lookup(ip="1.2.3.4") is None
+
+
+def test_config_from_file_is_cached(cache_dir, tmp_path, monkeypatch):
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("location: EH8\nPUE: 1.2\n")
+
+    assert configure.config_from_file(config_file) == {"location": "EH8", "PUE": 1.2}
+    assert (cache_dir / "config.pkl").exists()
+
+    # Next calls read from the caches, not the YAML parser
+    monkeypatch.setattr(configure, "load_yaml", None)
+    assert configure.config_from_file(config_file) == {"location": "EH8", "PUE": 1.2}
+    configure.clear_caches()
+    assert configure.config_from_file(config_file) == {"location": "EH8", "PUE": 1.2}
+
+
+def test_config_from_file_cache_invalidated(cache_dir, tmp_path):
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("location: EH8\n")
+    assert configure.config_from_file(config_file)["location"] == "EH8"
+
+    config_file.write_text("location: OX1 4AJ\n")
+    assert configure.config_from_file(config_file)["location"] == "OX1 4AJ"
+
+
+def test_prefetch_unless_location_given(cache_dir, monkeypatch):
+    from argparse import Namespace
+
+    calls = []
+
+    def fake_fetch(session=None):
+        calls.append(1)
+        return "OX1"
+
+    monkeypatch.setattr(configure, "_fetch_ip_location", fake_fetch)
+
+    assert configure.prefetch_ip_location(Namespace(location="EH8", config=None)) is None
+    assert calls == []
+
+    future = configure.prefetch_ip_location(Namespace(location=None, config="c.yml"))
+    assert future.result(timeout=5) == "OX1"
+    assert calls == [1]
+
+
+@pytest.fixture
+def geoip_db(tmp_path, monkeypatch):
+    import sys
+    import types
+
+    records = {
+        "1.2.3.4": {"postal": {"code": "OX1"}},
+        "5.6.7.8": {"country": {"iso_code": "GB"}},
+    }
+
+    class Reader:
+        def __init__(self, path, mode):
+            assert mode == "MODE_MMAP"
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def get(self, ip):
+            return records.get(ip)
+
+    maxminddb = types.ModuleType("maxminddb")
+    maxminddb.MODE_MMAP = "MODE_MMAP"
+    maxminddb.open_database = Reader
+    monkeypatch.setitem(sys.modules, "maxminddb", maxminddb)
+
+    db_path = tmp_path / "GeoLite2-City.mmdb"
+    db_path.write_bytes(b"")
+    monkeypatch.setenv("CATS_GEOIP_DB", str(db_path))
+
+
+def test_local_ip_lookup(geoip_db):
+    assert configure._local_ip_lookup(ip="1.2.3.4") == "OX1"
+    # IP address without postcode, or not in database
+    assert configure._local_ip_lookup(ip="5.6.7.8") is None
+    assert configure._local_ip_lookup(ip="9.9.9.9") is None
+
+
+def test_local_ip_lookup_public_ip(geoip_db):
+    class Response:
+        text = "1.2.3.4\n"
+
+    class Session:
+        def get(self, url, timeout=None):
+            assert url == "https://api.ipify.org"
+            return Response()
+
+    assert configure._local_ip_lookup(session=Session()) == "OX1"
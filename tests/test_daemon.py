@@ -0,0 +1,121 @@
+import os
+import socket
+import stat
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import cats
+from cats import CI_api_query, daemon
+from cats.CI_api_interface import InvalidLocationError
+from cats.forecast import CarbonIntensityPointEstimate
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="requires Unix domain sockets"
+)
+
+
+def fake_forecast(location, CI_API_interface, session=None):
+    if location == "A":
+        raise InvalidLocationError
+    fake_forecast.calls += 1
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return [
+        CarbonIntensityPointEstimate(
+            datetime=start + timedelta(minutes=30 * i),
+            value=100. + abs(i - 20),
+        )
+        for i in range(96)
+    ]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon, "get_CI_forecast", fake_forecast)
+    fake_forecast.calls = 0
+    path = tmp_path / "cats.sock"
+    with daemon.ForecastServer(path) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield path
+        server.shutdown()
+
+
+def test_forecast_shared_between_requests(server):
+    assert daemon.is_running(server)
+    for duration in (30, 60, 120):
+        now_avg, best_avg = daemon.query_estimates(
+            server, "carbonintensity.org.uk", "EH8", duration
+        )
+        assert best_avg.value <= now_avg.value
+        assert best_avg.end - best_avg.start == timedelta(minutes=duration)
+    assert fake_forecast.calls == 1
+
+
+def test_errors_forwarded_to_client(server):
+    with pytest.raises(InvalidLocationError):
+        daemon.query_estimates(server, "carbonintensity.org.uk", "A", 60)
+    with pytest.raises(ValueError):
+        daemon.query_estimates(server, "carbonintensity.org.uk", "EH8", 100 * 60)
+
+
+def test_not_running(tmp_path):
+    assert not daemon.is_running(tmp_path / "cats.sock")
+
+
+def test_socket_only_accessible_by_owner(server):
+    assert stat.S_IMODE(os.stat(server).st_mode) == 0o600
+
+
+def test_slow_forecast_does_not_block_other_locations(server, monkeypatch):
+    release = threading.Event()
+
+    def slow_forecast(location, CI_API_interface, session=None):
+        if location == "SLOW":
+            release.wait(10)
+        return fake_forecast(location, CI_API_interface, session)
+
+    monkeypatch.setattr(daemon, "get_CI_forecast", slow_forecast)
+    slow = threading.Thread(
+        target=daemon.query_estimates,
+        args=(server, "carbonintensity.org.uk", "SLOW", 60),
+    )
+    slow.start()
+    try:
+        fast = threading.Thread(
+            target=daemon.query_estimates,
+            args=(server, "carbonintensity.org.uk", "EH8", 60),
+        )
+        fast.start()
+        fast.join(5)
+        assert not fast.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert fake_forecast.calls == 2
+
+
+def test_client_falls_back_when_daemon_stopped(tmp_path, monkeypatch):
+    monkeypatch.setattr(CI_api_query, "get_CI_forecast", fake_forecast)
+    fake_forecast.calls = 0
+    get_estimates = cats._daemon_estimates(
+        tmp_path / "cats.sock", "carbonintensity.org.uk", "EH8"
+    )
+    for duration in (30, 60):
+        now_avg, best_avg = get_estimates(duration=duration)
+        assert best_avg.value <= now_avg.value
+    assert fake_forecast.calls == 1
+
+
+def test_socket_path_fallback_includes_hostname(monkeypatch):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    assert daemon.socket_path().name == f"cats-{socket.gethostname()}.sock"
+
+
+def test_serve_does_not_remove_other_files(tmp_path):
+    path = tmp_path / "cats.sock"
+    path.write_text("not a socket")
+    with pytest.raises(SystemExit):
+        daemon.serve(path)
+    assert path.read_text() == "not a socket"
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from cats.forecast import CarbonIntensityPointEstimate
+from cats.optimise_starttime import get_avg_estimates
+
+
+def make_forecast(hours):
+    start = datetime.now().replace(minute=0, second=0, microsecond=0)
+    return [
+        CarbonIntensityPointEstimate(
+            datetime=start + timedelta(minutes=30 * i),
+            value=100. + (i % 5),
+        )
+        for i in range(2 * hours + 1)
+    ]
+
+
+def test_duration_exceeds_horizon():
+    with pytest.raises(ValueError):
+        get_avg_estimates(make_forecast(hours=4), duration=5 * 60)
+
+
+def test_best_estimate_not_later_than_now():
+    now_avg, best_avg = get_avg_estimates(make_forecast(hours=24), duration=60)
+    assert best_avg.value <= now_avg.value
+    assert best_avg.start >= now_avg.start
+
+
+def test_duration_fills_horizon():
+    data = make_forecast(hours=4)
+    # End of the job falls within the last data interval
+    duration = int((data[-1].datetime - datetime.now()).total_seconds() // 60) - 1
+    now_avg, best_avg = get_avg_estimates(data, duration=duration)
+    assert now_avg == best_avg
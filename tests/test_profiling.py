@@ -0,0 +1,33 @@
+import pytest
+
+import cats
+from cats.profiling import profile, stage
+
+
+@pytest.mark.parametrize("value", [None, "", "0", "false"])
+def test_profile_disabled(monkeypatch, capsys, value):
+    if value is None:
+        monkeypatch.delenv("CATS_PROFILE", raising=False)
+    else:
+        monkeypatch.setenv("CATS_PROFILE", value)
+    with profile():
+        with stage("config"):
+            pass
+    assert capsys.readouterr().err == ""
+
+
+def test_profiling_submodule_reachable():
+    assert cats.profiling.stage is stage
+
+
+def test_profile_reports_stages(monkeypatch, capsys):
+    monkeypatch.setenv("CATS_PROFILE", "mem")
+    with profile():
+        with stage("config"):
+            pass
+        with stage("CI forecast"):
+            pass
+    err = capsys.readouterr().err
+    assert "config" in err
+    assert "CI forecast" in err
+    assert "peak" in err